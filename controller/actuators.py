@@ -3,9 +3,16 @@
 # This module controls the servo motor and chain actuator
 
 import time
+import micropython
+from micropython import const
+from array import array
 from machine import Pin, PWM
 import config
 
+# ESP32 GPIO output write-1-to-set/clear registers (GPIO 0-31)
+_GPIO_OUT_W1TS_REG = const(0x3FF44008)
+_GPIO_OUT_W1TC_REG = const(0x3FF4400C)
+
 # Initialize actuator objects
 servo_pwm = None
 chain_motor_pin1 = None
@@ -16,9 +23,33 @@ chain_motor_enable = None
 current_panel_angle = 90  # Default 90 degrees (vertical)
 window_state = "closed"  # Current window state ("closed", "open", "moving")
 
+# Non-blocking motion tracking
+SERVO_SETTLE_TIME_MS = 100  # Time allowed for the servo to reach position
+_servo_ready_at = 0  # ticks_ms() deadline until the servo has settled
+_window_target = None  # State the window is moving to ("open", "closed")
+_window_done_at = 0  # ticks_ms() deadline for the current window movement
+
+# Servo PWM duty (0-1023) for each angle 0-180, filled in initialize()
+_duty_table = array('H', [0] * 181)
+_last_duty = -1  # Last duty written to the servo PWM
+
+# Chain motor pin masks for direct register writes, computed in initialize()
+_PIN1_MASK = 0
+_PIN2_MASK = 0
+
 # Initialize actuators
 def initialize():
     global servo_pwm, chain_motor_pin1, chain_motor_pin2, chain_motor_enable
+    global _PIN1_MASK, _PIN2_MASK
+    global stop_chain_motor, _enable_motor
+    
+    # Precompute the servo duty cycle for every angle
+    # Map angle (0-180) to duty cycle (typically ~2.5% to ~12.5% for 0-180 degrees)
+    # For ESP32 PWM, duty is 0-1023
+    min_duty = int(config.SERVO_MIN_DUTY * 1023 / 100)
+    max_duty = int(config.SERVO_MAX_DUTY * 1023 / 100)
+    for angle in range(181):
+        _duty_table[angle] = int(min_duty + (max_duty - min_duty) * angle / 180)
     
     # Initialize servo for panel angle control
     servo_pin = Pin(config.SERVO_PIN)
@@ -26,14 +57,28 @@ def initialize():
     servo_pwm.freq(50)  # Standard 50Hz for servos
     
     # Initialize H-bridge for chain actuator control
+    # The motor is driven through the GPIO 0-31 output registers
+    if config.CHAIN_MOTOR_PIN1 >= 32 or config.CHAIN_MOTOR_PIN2 >= 32:
+        raise ValueError("Chain motor pins must be GPIO 0-31")
     chain_motor_pin1 = Pin(config.CHAIN_MOTOR_PIN1, Pin.OUT)
     chain_motor_pin2 = Pin(config.CHAIN_MOTOR_PIN2, Pin.OUT)
+    _PIN1_MASK = 1 << config.CHAIN_MOTOR_PIN1
+    _PIN2_MASK = 1 << config.CHAIN_MOTOR_PIN2
     
     # Enable pin for the motor driver (optional, set to None if not used)
     if hasattr(config, 'CHAIN_MOTOR_ENABLE_PIN') and config.CHAIN_MOTOR_ENABLE_PIN is not None:
         chain_motor_enable = Pin(config.CHAIN_MOTOR_ENABLE_PIN, Pin.OUT)
         chain_motor_enable.value(0)  # Start with motor disabled
     
+    # Bind the motor control variants matching the wiring once, so the
+    # enable pin check is not repeated on every actuation
+    if chain_motor_enable is not None:
+        stop_chain_motor = _stop_with_enable
+        _enable_motor = _enable_with_pin
+    else:
+        stop_chain_motor = _stop_no_enable
+        _enable_motor = _enable_no_pin
+    
     # Ensure motors are stopped initially
     stop_chain_motor()
     
@@ -42,44 +87,58 @@ def initialize():
     
     print("Actuators initialized successfully")
 
-# Convert angle to servo PWM duty cycle
-def angle_to_duty(angle):
-    # Map angle (0-180) to duty cycle (typically ~2.5% to ~12.5% for 0-180 degrees)
-    # For ESP32 PWM, duty is 0-1023
-    min_duty = int(config.SERVO_MIN_DUTY * 1023 / 100)
-    max_duty = int(config.SERVO_MAX_DUTY * 1023 / 100)
-    
-    # Linear mapping from angle to duty cycle
-    duty = min_duty + (max_duty - min_duty) * angle / 180
-    return int(duty)
+# Drive GPIO outputs high/low with a single register write
+@micropython.viper
+def gpio_set(mask: int):
+    ptr32(_GPIO_OUT_W1TS_REG)[0] = mask
+
+@micropython.viper
+def gpio_clr(mask: int):
+    ptr32(_GPIO_OUT_W1TC_REG)[0] = mask
 
 # Set panel angle using servo
+@micropython.native
 def set_panel_angle(angle):
-    global current_panel_angle
+    global current_panel_angle, _servo_ready_at, _last_duty
+    
+    # Angles from commands may be floats
+    angle = int(angle)
     
     # Constrain angle to valid range
-    angle = max(config.MIN_PANEL_ANGLE, min(config.MAX_PANEL_ANGLE, angle))
+    if angle < config.MIN_PANEL_ANGLE:
+        angle = config.MIN_PANEL_ANGLE
+    elif angle > config.MAX_PANEL_ANGLE:
+        angle = config.MAX_PANEL_ANGLE
     
-    # Calculate duty cycle
-    duty = angle_to_duty(angle)
-    
-    # Apply PWM signal to servo
-    servo_pwm.duty(duty)
+    # Look up duty cycle
+    duty = _duty_table[angle]
     
     # Update current angle
     current_panel_angle = angle
     
+    # Nothing to do if the servo is already at this PWM step
+    if duty == _last_duty:
+        return
+    
+    # Apply PWM signal to servo
+    servo_pwm.duty(duty)
+    _last_duty = duty
+    
     if config.DEBUG_MODE:
         print("Panel angle set to {} degrees (PWM duty: {})".format(angle, duty))
     
-    # Small delay to allow servo to reach position
-    time.sleep(0.1)
+    # Allow the servo time to reach position without blocking the caller
+    _servo_ready_at = time.ticks_add(time.ticks_ms(), SERVO_SETTLE_TIME_MS)
+
+# Check if the servo is still moving to its last position
+def servo_busy():
+    return time.ticks_diff(_servo_ready_at, time.ticks_ms()) > 0
 
 # Open window using chain actuator
 def open_window():
-    global window_state
+    global window_state, _window_target, _window_done_at
     
-    if window_state == "open":
+    if window_state == "open" or _window_target == "open":
         print("Window is already open")
         return
     
@@ -87,27 +146,21 @@ def open_window():
     window_state = "moving"
     
     # Enable motor if using enable pin
-    if chain_motor_enable is not None:
-        chain_motor_enable.value(1)
+    _enable_motor()
     
     # Set motor direction to open
-    chain_motor_pin1.value(1)
-    chain_motor_pin2.value(0)
+    gpio_clr(_PIN2_MASK)
+    gpio_set(_PIN1_MASK)
     
-    # Run motor for configured time
-    time.sleep(config.WINDOW_OPERATION_TIME)
-    
-    # Stop motor
-    stop_chain_motor()
-    
-    window_state = "open"
-    print("Window opened successfully")
+    # Run motor for configured time, update() stops it when done
+    _window_target = "open"
+    _window_done_at = time.ticks_add(time.ticks_ms(), config.get('WINDOW_OPERATION_TIME') * 1000)
 
 # Close window using chain actuator
 def close_window():
-    global window_state
+    global window_state, _window_target, _window_done_at
     
-    if window_state == "closed":
+    if window_state == "closed" or _window_target == "closed":
         print("Window is already closed")
         return
     
@@ -115,31 +168,56 @@ def close_window():
     window_state = "moving"
     
     # Enable motor if using enable pin
-    if chain_motor_enable is not None:
-        chain_motor_enable.value(1)
+    _enable_motor()
     
     # Set motor direction to close
-    chain_motor_pin1.value(0)
-    chain_motor_pin2.value(1)
+    gpio_clr(_PIN1_MASK)
+    gpio_set(_PIN2_MASK)
     
-    # Run motor for configured time
-    time.sleep(config.WINDOW_OPERATION_TIME)
+    # Run motor for configured time, update() stops it when done
+    _window_target = "closed"
+    _window_done_at = time.ticks_add(time.ticks_ms(), config.get('WINDOW_OPERATION_TIME') * 1000)
+
+# Finish window movement once the operation time has elapsed
+def update():
+    global window_state, _window_target
+    
+    if _window_target is None:
+        return
+    
+    if time.ticks_diff(time.ticks_ms(), _window_done_at) < 0:
+        return
     
     # Stop motor
     stop_chain_motor()
     
-    window_state = "closed"
-    print("Window closed successfully")
+    window_state = _window_target
+    _window_target = None
+    print("Window {} successfully".format("opened" if window_state == "open" else "closed"))
 
-# Stop chain motor
-def stop_chain_motor():
+# Stop chain motor (driver without enable pin)
+def _stop_no_enable():
     # Stop motor by setting both control pins low
-    chain_motor_pin1.value(0)
-    chain_motor_pin2.value(0)
+    gpio_clr(_PIN1_MASK | _PIN2_MASK)
+
+# Stop chain motor (driver with enable pin)
+def _stop_with_enable():
+    # Stop motor by setting both control pins low
+    gpio_clr(_PIN1_MASK | _PIN2_MASK)
     
-    # Disable motor if using enable pin
-    if chain_motor_enable is not None:
-        chain_motor_enable.value(0)
+    # Disable motor driver
+    chain_motor_enable.value(0)
+
+# Enable chain motor driver
+def _enable_no_pin():
+    pass
+
+def _enable_with_pin():
+    chain_motor_enable.value(1)
+
+# Active variants, rebound in initialize()
+stop_chain_motor = _stop_no_enable
+_enable_motor = _enable_no_pin
 
 # Get current actuator status
 def get_status():
@@ -150,5 +228,7 @@ def get_status():
 
 # Emergency stop all actuators
 def emergency_stop():
+    global _window_target
     stop_chain_motor()
+    _window_target = None  # Window position is unknown, leave it as "moving"
     print("Emergency stop activated - all actuators stopped")
\ No newline at end of file
@@ -1,6 +1,11 @@
 # IntelliGlass - Smart Solar Window System
 # Configuration Module for ESP32
 # This module contains all configurable parameters for the system
+# Integer settings are wrapped in const() to mark them as fixed; other modules
+# still read them as ordinary attributes. Runtime changes are stored by
+# update_from_dict() and only take effect where code reads them with get().
+
+from micropython import const
 
 # Device Information
 DEVICE_ID = "intelliGlass-001"  # Unique device identifier
@@ -8,60 +13,63 @@ DEVICE_NAME = "IntelliGlass Window Controller"  # Human-readable device name
 FIRMWARE_VERSION = "1.0.0"  # Firmware version
 
 # Debug Settings
-DEBUG_MODE = True  # Enable/disable debug output
+DEBUG_MODE = const(0)  # Debug output, set to const(1) for development builds
 
 # Pin Configuration
 # LDR Sensors (Light Dependent Resistors)
-LDR1_PIN = 32  # ADC pin for first LDR sensor
-LDR2_PIN = 33  # ADC pin for second LDR sensor
+LDR1_PIN = const(32)  # ADC pin for first LDR sensor
+LDR2_PIN = const(33)  # ADC pin for second LDR sensor
 
 # Rain Sensor (YL-83)
-RAIN_SENSOR_PIN = 34  # ADC pin for rain sensor
+RAIN_SENSOR_PIN = const(34)  # ADC pin for rain sensor
 
 # Smoke Sensor (MQ-2)
-SMOKE_SENSOR_PIN = 35  # ADC pin for smoke sensor
+SMOKE_SENSOR_PIN = const(35)  # ADC pin for smoke sensor
 
 # Servo Motor for Panel Angle
-SERVO_PIN = 25  # PWM pin for servo control
+SERVO_PIN = const(25)  # PWM pin for servo control
 
 # Chain Actuator for Window Opening/Closing
-CHAIN_MOTOR_PIN1 = 26  # H-bridge control pin 1
-CHAIN_MOTOR_PIN2 = 27  # H-bridge control pin 2
-CHAIN_MOTOR_ENABLE_PIN = 14  # Optional enable pin for motor driver
+CHAIN_MOTOR_PIN1 = const(26)  # H-bridge control pin 1
+CHAIN_MOTOR_PIN2 = const(27)  # H-bridge control pin 2
+CHAIN_MOTOR_ENABLE_PIN = const(14)  # Optional enable pin for motor driver
 
 # Status LED
-STATUS_LED_PIN = 2  # Built-in LED on most ESP32 boards
+STATUS_LED_PIN = const(2)  # Built-in LED on most ESP32 boards
 
 # Servo Configuration
 SERVO_MIN_DUTY = 2.5  # Minimum duty cycle (%) for 0 degrees
 SERVO_MAX_DUTY = 12.5  # Maximum duty cycle (%) for 180 degrees
-MIN_PANEL_ANGLE = 0  # Minimum panel angle in degrees
-MAX_PANEL_ANGLE = 180  # Maximum panel angle in degrees
+MIN_PANEL_ANGLE = const(0)  # Minimum panel angle in degrees
+MAX_PANEL_ANGLE = const(180)  # Maximum panel angle in degrees
 
 # Window Operation
-WINDOW_OPERATION_TIME = 10  # Time in seconds to fully open/close window
+WINDOW_OPERATION_TIME = const(10)  # Time in seconds to fully open/close window
 
 # Tracking Configuration
 ANGLE_SCALING_FACTOR = 0.01  # Scaling factor for PI controller output to angle
-MIN_LIGHT_THRESHOLD = 200  # Minimum light level for tracking to operate
-MAX_INTEGRAL = 100  # Anti-windup limit for integral term
+MIN_LIGHT_THRESHOLD = const(200)  # Minimum light level for tracking to operate
+MAX_INTEGRAL = const(100)  # Anti-windup limit for integral term
 
 # Sensor Configuration
 SENSOR_SMOOTHING = True  # Enable sensor reading smoothing
-SENSOR_CHECK_INTERVAL = 2  # Seconds between sensor checks
+SENSOR_SMOOTHING_ALPHA = const(64)  # Weight of new LDR samples in 1/256ths (lower is smoother)
+SENSOR_CHECK_INTERVAL = const(2)  # Seconds between sensor checks
 
 # WiFi Configuration
 WIFI_SSID = "YourWiFiNetwork"  # WiFi network name
 WIFI_PASSWORD = "YourWiFiPassword"  # WiFi password
-WIFI_TIMEOUT = 20  # Connection timeout in seconds
+WIFI_TIMEOUT = const(20)  # Connection timeout in seconds
+WIFI_MIN_RSSI = const(-85)  # Networks at or below this RSSI (dBm) are left out of scans
+WIFI_POWER_SAVE = False  # Allow WiFi modem sleep (saves power, adds network latency)
 
 # MQTT Configuration
 MQTT_BROKER = "intelliGlass.cloud.thingspeak.com"  # MQTT broker address
-MQTT_PORT = 1883  # MQTT broker port (1883 for non-SSL, 8883 for SSL)
+MQTT_PORT = const(1883)  # MQTT broker port (1883 for non-SSL, 8883 for SSL)
 MQTT_CLIENT_ID = "intelliGlass-" + DEVICE_ID  # MQTT client ID
 MQTT_USER = "intelliGlass"  # MQTT username
 MQTT_PASSWORD = "YourMQTTPassword"  # MQTT password
-MQTT_KEEPALIVE = 60  # Keepalive interval in seconds
+MQTT_KEEPALIVE = const(60)  # Keepalive interval in seconds
 MQTT_USE_SSL = False  # Use SSL/TLS for MQTT connection
 
 # MQTT Topics
@@ -70,29 +78,46 @@ MQTT_STATUS_TOPIC = MQTT_BASE_TOPIC + "/status"  # Topic for status updates
 MQTT_COMMAND_TOPIC = MQTT_BASE_TOPIC + "/commands"  # Topic for receiving commands
 MQTT_ALERT_TOPIC = MQTT_BASE_TOPIC + "/alerts"  # Topic for sending alerts
 
+# Memory Management
+GC_INTERVAL = const(60)  # Seconds between garbage collections in the main loop
+
 # Power Management
 DEEP_SLEEP_ENABLE = False  # Enable deep sleep mode when idle
-DEEP_SLEEP_INTERVAL = 300  # Deep sleep interval in seconds
+DEEP_SLEEP_INTERVAL = const(300)  # Deep sleep interval in seconds
 
 # Over-the-Air Update
 OTA_ENABLED = True  # Enable OTA updates
 OTA_SERVER = "https://intelliGlass.com/firmware"  # OTA update server
-OTA_CHECK_INTERVAL = 86400  # Check for updates every 24 hours
+OTA_CHECK_INTERVAL = const(86400)  # Check for updates every 24 hours
+
+# Runtime overrides received from external sources (the constants above
+# are fixed at compile time and are never mutated)
+_runtime_config = {}
 
 # Function to update configuration from external source (e.g., MQTT, file)
 def update_from_dict(config_dict):
-    """Update configuration parameters from a dictionary"""
+    """Store runtime overrides for configuration parameters from a dictionary"""
     for key, value in config_dict.items():
-        if key in globals() and not key.startswith('_'):
-            globals()[key] = value
-            print(f"Updated config: {key} = {value}")
+        if key in globals() and not key.startswith('_') and not callable(globals()[key]):
+            _runtime_config[key] = value
+            print(f"Stored config override: {key} = {value}")
+
+# Function to read a configuration value, honouring runtime overrides
+def get(key):
+    """Return a configuration parameter, preferring any runtime override"""
+    return _runtime_config.get(key, globals()[key])
 
 # Function to get all configuration as a dictionary
 def get_all_config():
-    """Return all configuration parameters as a dictionary"""
+    """Return all configuration parameters as a dictionary (overrides excluded)"""
     config_dict = {}
     for key, value in globals().items():
         # Only include variables that don't start with underscore and are not functions
         if not key.startswith('_') and not callable(value):
             config_dict[key] = value
-    return config_dict
\ No newline at end of file
+    return config_dict
+
+# Function to get the runtime overrides stored so far
+def get_overrides():
+    """Return the runtime overrides as a dictionary"""
+    return dict(_runtime_config)
\ No newline at end of file
@@ -4,8 +4,8 @@
 
 import time
 import gc
+from micropython import const
 from machine import Pin, ADC
-import ujson
 
 # Import custom modules
 import tracking
@@ -27,6 +27,23 @@ system_status = {
     "auto_mode": True
 }
 
+# MQTT payload templates for fixed message schemas
+_JSON_BOOL = ("false", "true")
+_STATUS_FMT = ('{"window_open":%s,"tracking_enabled":%s,"panel_angle":%d,'
+               '"light_level":%d,"rain_detected":%s,"smoke_detected":%s,'
+               '"timestamp":%d,"auto_mode":%s}')
+_RAIN_ALERT = '{"type":"emergency","reason":"rain","timestamp":%d}'
+_SMOKE_ALERT = '{"type":"emergency","reason":"smoke","timestamp":%d}'
+
+# Command actions, IDs index into _ACTIONS (offset by one)
+_ACT_NONE = const(0)
+_ACT_OPEN_WINDOW = const(1)
+_ACT_CLOSE_WINDOW = const(2)
+_ACT_SET_ANGLE = const(3)
+_ACT_TOGGLE_TRACKING = const(4)
+_ACT_TOGGLE_AUTO = const(5)
+_ACTIONS = (b"open_window", b"close_window", b"set_angle", b"toggle_tracking", b"toggle_auto")
+
 # Status LED
 status_led = Pin(config.STATUS_LED_PIN, Pin.OUT)
 
@@ -61,46 +78,64 @@ def initialize_system():
 
 # Main control loop
 def main_loop():
-    last_mqtt_publish = 0
-    last_sensor_check = 0
+    # Start with sensor check and status publish due immediately
+    now = time.ticks_ms()
+    last_mqtt_publish = time.ticks_add(now, -30000)
+    last_sensor_check = time.ticks_add(now, -2000)
+    last_gc = now
+    gc_interval_ms = config.GC_INTERVAL * 1000
+    
+    # Bind frequently used functions and state locally for the loop
+    _ticks_ms = time.ticks_ms
+    _ticks_diff = time.ticks_diff
+    _sleep = time.sleep
+    _is_conn = mqtt.is_connected
+    _check = mqtt.check_msg
+    _actuators_update = actuators.update
+    _track_update = tracking.update
+    _st = system_status
     
     while True:
-        current_time = time.time()
+        current_time = _ticks_ms()
         
         # Check sensors every 2 seconds
-        if current_time - last_sensor_check >= 2:
+        if _ticks_diff(current_time, last_sensor_check) >= 2000:
             check_sensors()
             last_sensor_check = current_time
         
+        # Advance any window movement in progress
+        _actuators_update()
+        
         # Run solar tracking if enabled
-        if system_status["tracking_enabled"] and system_status["auto_mode"]:
-            tracking.update()
+        if _st["tracking_enabled"] and _st["auto_mode"]:
+            _track_update()
         
         # Publish status every 30 seconds
-        if current_time - last_mqtt_publish >= 30 and mqtt.is_connected():
+        if _ticks_diff(current_time, last_mqtt_publish) >= 30000 and _is_conn():
             publish_status()
             last_mqtt_publish = current_time
         
         # Process any pending MQTT messages
-        if mqtt.is_connected():
-            mqtt.check_msg()
+        if _is_conn():
+            _check()
         
         # Give some time to other processes and save power
-        time.sleep(0.1)
+        _sleep(0.1)
         
         # Run garbage collection to prevent memory issues
-        if current_time % 60 == 0:  # Every minute
+        if _ticks_diff(current_time, last_gc) >= gc_interval_ms:
             gc.collect()
+            last_gc = current_time
 
 # Check all sensors and respond to conditions
 def check_sensors():
     # Read sensor values
-    light_values = sensors.read_light_sensors()
-    rain_detected = sensors.check_rain()
-    smoke_detected = sensors.check_smoke()
+    ldr1_value, ldr2_value, rain_value, smoke_value = sensors.sample_all()
+    rain_detected = rain_value < sensors.rain_threshold
+    smoke_detected = smoke_value > sensors.smoke_threshold
     
     # Update system status
-    system_status["light_level"] = sum(light_values) / len(light_values)
+    system_status["light_level"] = (ldr1_value + ldr2_value) * 0.5
     system_status["rain_detected"] = rain_detected
     system_status["smoke_detected"] = smoke_detected
     system_status["last_update"] = time.time()
@@ -117,55 +152,99 @@ def emergency_close():
     
     # Notify via MQTT if connected
     if mqtt.is_connected():
-        alert_data = {
-            "type": "emergency",
-            "reason": "rain" if system_status["rain_detected"] else "smoke",
-            "timestamp": time.time()
-        }
-        mqtt.publish(config.MQTT_ALERT_TOPIC, ujson.dumps(alert_data))
+        alert = _RAIN_ALERT if system_status["rain_detected"] else _SMOKE_ALERT
+        mqtt.publish(config.MQTT_ALERT_TOPIC, alert % time.time())
 
 # Publish system status via MQTT
 def publish_status():
-    status_data = {
-        "window_open": system_status["window_open"],
-        "tracking_enabled": system_status["tracking_enabled"],
-        "panel_angle": system_status["panel_angle"],
-        "light_level": system_status["light_level"],
-        "rain_detected": system_status["rain_detected"],
-        "smoke_detected": system_status["smoke_detected"],
-        "timestamp": system_status["last_update"],
-        "auto_mode": system_status["auto_mode"]
-    }
-    mqtt.publish(config.MQTT_STATUS_TOPIC, ujson.dumps(status_data))
+    s = system_status
+    mqtt.publish(config.MQTT_STATUS_TOPIC, _STATUS_FMT % (
+        _JSON_BOOL[s["window_open"]],
+        _JSON_BOOL[s["tracking_enabled"]],
+        s["panel_angle"],
+        s["light_level"],
+        _JSON_BOOL[s["rain_detected"]],
+        _JSON_BOOL[s["smoke_detected"]],
+        s["last_update"],
+        _JSON_BOOL[s["auto_mode"]]))
+
+# Find where the value of a key starts in a flat JSON object (-1 if missing)
+def _find_value(msg, key):
+    i = msg.find(key)
+    if i < 0:
+        return -1
+    i = msg.find(b":", i + len(key))
+    if i < 0:
+        return -1
+    
+    # Skip whitespace after the colon
+    i += 1
+    n = len(msg)
+    while i < n and msg[i] in (32, 9, 10, 13):
+        i += 1
+    return i if i < n else -1
+
+# Parse a command message into (action ID, angle or None)
+# Commands have a fixed schema, e.g. {"action": "set_angle", "angle": 45}
+def _parse_cmd(msg):
+    start = _find_value(msg, b'"action"')
+    if start < 0 or msg[start] != 34:  # Value must be a string
+        return (_ACT_NONE, None)
+    end = msg.find(b'"', start + 1)
+    if end < 0:
+        return (_ACT_NONE, None)
+    
+    action = msg[start + 1:end]
+    action_id = _ACT_NONE
+    for i in range(len(_ACTIONS)):
+        if action == _ACTIONS[i]:
+            action_id = i + 1
+            break
+    
+    angle = None
+    if action_id == _ACT_SET_ANGLE:
+        start = _find_value(msg, b'"angle"')
+        if start >= 0:
+            # Integer part of the number (fractional degrees are dropped)
+            end = start
+            n = len(msg)
+            while end < n and (48 <= msg[end] <= 57 or (end == start and msg[end] == 45)):
+                end += 1
+            if end > start:
+                angle = int(msg[start:end])
+    
+    return (action_id, angle)
 
 # Callback for MQTT commands
 def command_callback(topic, message):
     try:
-        command = ujson.loads(message)
+        action, angle = _parse_cmd(message)
         
-        if "action" in command:
-            if command["action"] == "open_window" and not (system_status["rain_detected"] or system_status["smoke_detected"]):
-                system_status["window_open"] = True
-                actuators.open_window()
-                
-            elif command["action"] == "close_window":
-                system_status["window_open"] = False
-                actuators.close_window()
-                
-            elif command["action"] == "set_angle" and "angle" in command:
-                angle = max(0, min(180, command["angle"]))  # Constrain between 0-180
-                system_status["panel_angle"] = angle
-                actuators.set_panel_angle(angle)
-                
-            elif command["action"] == "toggle_tracking":
-                system_status["tracking_enabled"] = not system_status["tracking_enabled"]
-                
-            elif command["action"] == "toggle_auto":
-                system_status["auto_mode"] = not system_status["auto_mode"]
-                
-            # Publish updated status after command execution
-            publish_status()
+        if action == _ACT_NONE:
+            return
+        
+        if action == _ACT_OPEN_WINDOW and not (system_status["rain_detected"] or system_status["smoke_detected"]):
+            system_status["window_open"] = True
+            actuators.open_window()
+            
+        elif action == _ACT_CLOSE_WINDOW:
+            system_status["window_open"] = False
+            actuators.close_window()
             
+        elif action == _ACT_SET_ANGLE and angle is not None:
+            angle = max(config.get('MIN_PANEL_ANGLE'), min(config.get('MAX_PANEL_ANGLE'), angle))  # Constrain to the configured range
+            system_status["panel_angle"] = angle
+            actuators.set_panel_angle(angle)
+            
+        elif action == _ACT_TOGGLE_TRACKING:
+            system_status["tracking_enabled"] = not system_status["tracking_enabled"]
+            
+        elif action == _ACT_TOGGLE_AUTO:
+            system_status["auto_mode"] = not system_status["auto_mode"]
+            
+        # Publish updated status after command execution
+        publish_status()
+        
     except Exception as e:
         print("Error processing command:", e)
 
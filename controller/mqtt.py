@@ -3,8 +3,8 @@
 # This module handles MQTT communication with the backend
 
 import time
+import uselect
 from umqtt.simple import MQTTClient
-import ujson
 import config
 
 # MQTT client
@@ -12,6 +12,17 @@ client = None
 connected = False
 command_callback = None
 
+# Poller used to check for incoming data without touching the socket
+_poller = None
+_polled_sock = None
+
+# Connection status payload templates (device ID is fixed at build time)
+_CONNECTED_FMT = '{"status":"connected","device_id":"' + config.DEVICE_ID + '","timestamp":%d}'
+_DISCONNECTED_FMT = '{"status":"disconnected","device_id":"' + config.DEVICE_ID + '","timestamp":%d}'
+
+# Command topic as received from the client, so topics need no decoding
+_COMMAND_TOPIC_B = config.MQTT_COMMAND_TOPIC.encode('utf-8')
+
 # Connect to MQTT broker
 def connect():
     global client, connected
@@ -40,15 +51,14 @@ def connect():
         # Subscribe to command topic
         client.subscribe(config.MQTT_COMMAND_TOPIC)
         
+        # Watch the socket for incoming data
+        _register_poll()
+        
         connected = True
         print("Connected to MQTT broker at {}".format(config.MQTT_BROKER))
         
         # Publish connection status
-        publish(config.MQTT_STATUS_TOPIC, ujson.dumps({
-            "status": "connected",
-            "device_id": config.DEVICE_ID,
-            "timestamp": time.time()
-        }))
+        publish(config.MQTT_STATUS_TOPIC, _CONNECTED_FMT % time.time())
         
         return True
         
@@ -64,11 +74,7 @@ def disconnect():
     if client and connected:
         try:
             # Publish disconnect message
-            publish(config.MQTT_STATUS_TOPIC, ujson.dumps({
-                "status": "disconnected",
-                "device_id": config.DEVICE_ID,
-                "timestamp": time.time()
-            }))
+            publish(config.MQTT_STATUS_TOPIC, _DISCONNECTED_FMT % time.time())
             
             client.disconnect()
             connected = False
@@ -79,6 +85,8 @@ def disconnect():
 
 # Publish message to topic
 def publish(topic, message):
+    global connected
+    
     if client and connected:
         try:
             client.publish(topic, message)
@@ -93,6 +101,8 @@ def publish(topic, message):
 
 # Subscribe to a topic
 def subscribe(topic):
+    global connected
+    
     if client and connected:
         try:
             client.subscribe(topic)
@@ -110,26 +120,42 @@ def subscribe_to_commands(callback):
     command_callback = callback
 
 # Internal message callback
+# The command callback receives the topic and message as raw bytes
 def _message_callback(topic, msg):
     try:
-        topic_str = topic.decode('utf-8')
-        msg_str = msg.decode('utf-8')
-        
         if config.DEBUG_MODE:
-            print("Message received on {}: {}".format(topic_str, msg_str))
+            print("Message received on {}: {}".format(topic.decode('utf-8'), msg.decode('utf-8')))
         
         # Handle command messages
-        if topic_str == config.MQTT_COMMAND_TOPIC and command_callback:
-            command_callback(topic_str, msg_str)
+        if topic == _COMMAND_TOPIC_B and command_callback:
+            command_callback(topic, msg)
             
     except Exception as e:
         print("Error processing MQTT message:", e)
 
+# Register the client socket with the poller (again after a reconnect)
+# umqtt.simple raises on socket errors instead of reconnecting by itself, so
+# failures reach the handlers here and ensure_connection() stays in charge
+def _register_poll():
+    global _poller, _polled_sock
+    
+    if _poller is None:
+        _poller = uselect.poll()
+    elif _polled_sock is not None:
+        _poller.unregister(_polled_sock)
+    
+    _poller.register(client.sock, uselect.POLLIN)
+    _polled_sock = client.sock
+
 # Check for pending messages
 def check_msg():
+    global connected
+    
     if client and connected:
         try:
-            client.check_msg()
+            # Only read from the socket when data (or an error) is pending
+            if _poller.poll(0):
+                client.check_msg()
             return True
         except Exception as e:
             print("Error checking MQTT messages:", e)
@@ -3,9 +3,22 @@
 # This module handles all sensor readings (LDR, rain, smoke)
 
 import time
+import micropython
+from micropython import const
+from array import array
 from machine import Pin, ADC
 import config
 
+# Native LDR sampling (optional, only present when built into the firmware)
+try:
+    import fast_sensors
+except ImportError:
+    fast_sensors = None
+
+# The native module reads fixed ADC channels (GPIO32 and GPIO33)
+if config.LDR1_PIN != 32 or config.LDR2_PIN != 33:
+    fast_sensors = None
+
 # Initialize sensor pins
 ldr1 = None
 ldr2 = None
@@ -13,10 +26,27 @@ rain_sensor = None
 smoke_sensor = None
 
 # Sensor calibration values
-ldr_calibration = [1.0, 1.0]  # Multipliers to balance LDR sensors
+ldr_calibration = [65536, 65536]  # Q16.16 multipliers to balance LDR sensors (65536 = 1.0)
 rain_threshold = 1000  # ADC value threshold for rain detection
 smoke_threshold = 1200  # ADC value threshold for smoke detection
 
+# Exponential smoothing state per LDR, scaled by 256 (-1 until first sample)
+_ema_state = array('i', [-1, -1])
+
+# Calibration factors are capped at 4.0 so calibrated readings stay below
+# 2**14 (4095 * 4), which keeps the smoothing arithmetic within 31 bits
+_MAX_CALIBRATION = const(4 << 16)
+_EMA_MAX_INPUT = const(16383)
+
+# Reading snapshot returned by get_all_readings(), updated in place
+_readings = {
+    "ldr1": 0,
+    "ldr2": 0,
+    "rain_detected": False,
+    "smoke_detected": False,
+    "timestamp": 0
+}
+
 # Initialize all sensors
 def initialize():
     global ldr1, ldr2, rain_sensor, smoke_sensor
@@ -42,26 +72,49 @@ def initialize():
     # Perform initial calibration
     calibrate_ldr_sensors()
 
+# Exponential moving average of one LDR channel
+# new = old + (raw - old) * alpha / 256, kept in 1/256ths
+# With raw clamped below 2**14 and alpha <= 256 every intermediate fits in
+# 31 bits: (raw << 8) < 2**22 and the scaled difference < 2**30
+@micropython.viper
+def _ema(state, index: int, raw: int, alpha: int) -> int:
+    if raw > _EMA_MAX_INPUT:
+        raw = _EMA_MAX_INPUT
+    elif raw < 0:
+        raw = 0
+    s = ptr32(state)
+    value = s[index]
+    if value < 0:
+        # First sample seeds the filter
+        value = raw << 8
+    else:
+        value += (((raw << 8) - value) * alpha) >> 8
+    s[index] = value
+    return value >> 8
+
 # Read light sensor values
 def read_light_sensors():
-    # Read raw values
-    ldr1_value = ldr1.read()
-    ldr2_value = ldr2.read()
-    
-    # Apply calibration
-    ldr1_calibrated = ldr1_value * ldr_calibration[0]
-    ldr2_calibrated = ldr2_value * ldr_calibration[1]
+    if fast_sensors is not None:
+        # Native module reads and calibrates both sensors
+        ldr1_calibrated, ldr2_calibrated = fast_sensors.read()
+    else:
+        # Read raw values
+        ldr1_value = ldr1.read()
+        ldr2_value = ldr2.read()
+        
+        # Apply calibration (Q16.16 fixed point)
+        ldr1_calibrated = (ldr1_value * ldr_calibration[0]) >> 16
+        ldr2_calibrated = (ldr2_value * ldr_calibration[1]) >> 16
     
     # Apply smoothing if configured
     if hasattr(config, 'SENSOR_SMOOTHING') and config.SENSOR_SMOOTHING:
-        # Simple exponential smoothing could be implemented here
-        pass
+        ldr1_calibrated = _ema(_ema_state, 0, ldr1_calibrated, config.SENSOR_SMOOTHING_ALPHA)
+        ldr2_calibrated = _ema(_ema_state, 1, ldr2_calibrated, config.SENSOR_SMOOTHING_ALPHA)
     
     if config.DEBUG_MODE:
-        print("LDR readings - LDR1: {} (raw: {}), LDR2: {} (raw: {})".format(
-            ldr1_calibrated, ldr1_value, ldr2_calibrated, ldr2_value))
+        print("LDR readings - LDR1: {}, LDR2: {}".format(ldr1_calibrated, ldr2_calibrated))
     
-    return [ldr1_calibrated, ldr2_calibrated]
+    return (ldr1_calibrated, ldr2_calibrated)
 
 # Check rain sensor
 def check_rain():
@@ -107,20 +160,34 @@ def calibrate_ldr_sensors():
         ldr2_sum += ldr2.read()
         time.sleep(0.1)
     
-    ldr1_avg = ldr1_sum / samples
-    ldr2_avg = ldr2_sum / samples
+    ldr1_avg = ldr1_sum // samples
+    ldr2_avg = ldr2_sum // samples
     
     # If both readings are very low, skip calibration (might be dark)
     if ldr1_avg < 100 and ldr2_avg < 100:
         print("Light level too low for calibration. Using default values.")
         return
     
-    # Calculate calibration factors
+    # A sensor reading zero is disconnected or fully covered, scaling the
+    # other one against it would zero out its readings
+    if ldr1_avg == 0 or ldr2_avg == 0:
+        print("LDR sensor reads zero, skipping calibration. Using default values.")
+        return
+    
+    # Calculate calibration factors (Q16.16 fixed point)
     # We'll normalize to the higher value
-    if ldr1_avg >= ldr2_avg and ldr1_avg > 0:
-        ldr_calibration = [1.0, ldr1_avg / ldr2_avg]
-    elif ldr2_avg > 0:
-        ldr_calibration = [ldr2_avg / ldr1_avg, 1.0]
+    if ldr1_avg >= ldr2_avg:
+        ldr_calibration = [65536, min((ldr1_avg * 65536) // ldr2_avg, _MAX_CALIBRATION)]
+    else:
+        ldr_calibration = [min((ldr2_avg * 65536) // ldr1_avg, _MAX_CALIBRATION), 65536]
+    
+    # Keep the native module in sync
+    if fast_sensors is not None:
+        fast_sensors.set_calibration(ldr_calibration[0], ldr_calibration[1])
+    
+    # Restart smoothing from the newly calibrated readings
+    _ema_state[0] = -1
+    _ema_state[1] = -1
     
     print("LDR calibration complete. Factors: {}".format(ldr_calibration))
 
@@ -135,16 +202,23 @@ def set_smoke_threshold(value):
     smoke_threshold = value
     print("Smoke threshold set to {}".format(smoke_threshold))
 
+# Sample all sensors in one call
+# Returns (ldr1, ldr2, rain, smoke) with calibrated LDR values and raw
+# rain/smoke ADC values
+@micropython.native
+def sample_all():
+    ldr1_value, ldr2_value = read_light_sensors()
+    return (ldr1_value, ldr2_value, rain_sensor.read(), smoke_sensor.read())
+
 # Get all sensor readings at once
+# The same dict is reused on every call, copy it if it needs to be kept
 def get_all_readings():
-    light_values = read_light_sensors()
-    rain = check_rain()
-    smoke = check_smoke()
-    
-    return {
-        "ldr1": light_values[0],
-        "ldr2": light_values[1],
-        "rain_detected": rain,
-        "smoke_detected": smoke,
-        "timestamp": time.time()
-    }
\ No newline at end of file
+    ldr1_value, ldr2_value, rain_value, smoke_value = sample_all()
+    
+    _readings["ldr1"] = ldr1_value
+    _readings["ldr2"] = ldr2_value
+    _readings["rain_detected"] = rain_value < rain_threshold
+    _readings["smoke_detected"] = smoke_value > smoke_threshold
+    _readings["timestamp"] = time.time()
+    
+    return _readings
\ No newline at end of file
@@ -3,6 +3,7 @@
 # This module handles solar tracking using LDR sensors and PI control
 
 import time
+import micropython
 from machine import Pin, ADC
 import math
 
@@ -17,69 +18,96 @@ I_GAIN = 180  # Integral gain
 
 # Tracking variables
 last_error = 0
-integral_error = 0
-last_update_time = 0
+integral_error = 0  # Accumulated in error * milliseconds
+last_update_time = 0  # time.ticks_ms() of the last update
 target_angle = 90  # Default angle (vertical)
 
+# Configuration and functions used by update(), bound once at import to
+# avoid repeated module attribute lookups in the tracking loop
+_MIN_L = config.MIN_LIGHT_THRESHOLD
+_MAX_I = config.MAX_INTEGRAL * 1000  # In error * milliseconds
+_SCALE = config.ANGLE_SCALING_FACTOR
+_MINA = config.MIN_PANEL_ANGLE
+_MAXA = config.MAX_PANEL_ANGLE
+_DEBUG = config.DEBUG_MODE
+_read = sensors.read_light_sensors
+_set = actuators.set_panel_angle
+_servo_busy = actuators.servo_busy
+_ticks_ms = time.ticks_ms
+_ticks_diff = time.ticks_diff
+
 # Initialize tracking system
 def initialize():
     global last_update_time
-    last_update_time = time.time()
+    last_update_time = time.ticks_ms()
     print("Solar tracking system initialized with P={}, I={}".format(P_GAIN, I_GAIN))
 
 # Main tracking update function
+@micropython.native
 def update():
     global last_error, integral_error, last_update_time, target_angle
     
+    # Wait for the servo to settle from the previous update
+    if _servo_busy():
+        return
+    
     # Get current light sensor readings
-    ldr_values = sensors.read_light_sensors()
+    ldr1_value, ldr2_value = _read()
     
     # Skip tracking if light levels are too low (night time or very cloudy)
-    if max(ldr_values) < config.MIN_LIGHT_THRESHOLD:
-        print("Light level too low for tracking: {}".format(max(ldr_values)))
+    if ldr1_value < _MIN_L and ldr2_value < _MIN_L:
+        if _DEBUG:
+            print("Light level too low for tracking: {}".format(max(ldr1_value, ldr2_value)))
         return
     
     # Calculate error (difference between LDR sensors)
     # For perfect alignment, LDR1 - LDR2 should be 0
-    error = ldr_values[0] - ldr_values[1]
+    error = ldr1_value - ldr2_value
     
     # Calculate time delta for integral component
-    current_time = time.time()
-    dt = current_time - last_update_time
+    current_time = _ticks_ms()
+    dt_ms = _ticks_diff(current_time, last_update_time)
     last_update_time = current_time
     
     # Prevent division by zero or very small dt
-    if dt < 0.01:
-        dt = 0.01
+    if dt_ms < 10:
+        dt_ms = 10
     
     # Update integral error with anti-windup
-    integral_error += error * dt
+    integral_error += error * dt_ms
     
     # Apply anti-windup to integral term (limit accumulation)
-    integral_error = max(-config.MAX_INTEGRAL, min(config.MAX_INTEGRAL, integral_error))
+    if integral_error > _MAX_I:
+        integral_error = _MAX_I
+    elif integral_error < -_MAX_I:
+        integral_error = -_MAX_I
     
     # Calculate PI control output
     p_term = P_GAIN * error
-    i_term = I_GAIN * integral_error
+    i_term = I_GAIN * integral_error // 1000
     control_output = p_term + i_term
     
     # Scale control output to angle adjustment
     # The scaling factor determines how sensitive the system is to light changes
-    angle_adjustment = control_output * config.ANGLE_SCALING_FACTOR
+    angle_adjustment = control_output * _SCALE
     
     # Update target angle
+    # Kept fractional so small adjustments accumulate across updates
     target_angle += angle_adjustment
     
     # Constrain angle to valid range (0-180 degrees)
-    target_angle = max(config.MIN_PANEL_ANGLE, min(config.MAX_PANEL_ANGLE, target_angle))
+    if target_angle < _MINA:
+        target_angle = _MINA
+    elif target_angle > _MAXA:
+        target_angle = _MAXA
     
     # Apply the new angle to the servo
-    actuators.set_panel_angle(target_angle)
+    _set(int(target_angle))
     
     # Debug output
-    if config.DEBUG_MODE:
+    if _DEBUG:
         print("Tracking update: LDR1={}, LDR2={}, Error={}, P={}, I={}, Angle={}".format(
-            ldr_values[0], ldr_values[1], error, p_term, i_term, target_angle))
+            ldr1_value, ldr2_value, error, p_term, i_term, target_angle))
 
 # Reset tracking to default position
 def reset():
@@ -93,7 +121,7 @@ def reset():
 # Set tracking to specific angle (manual override)
 def set_angle(angle):
     global target_angle, integral_error
-    target_angle = max(config.MIN_PANEL_ANGLE, min(config.MAX_PANEL_ANGLE, angle))
+    target_angle = int(max(config.MIN_PANEL_ANGLE, min(config.MAX_PANEL_ANGLE, angle)))
     integral_error = 0  # Reset integral error when manually setting angle
     actuators.set_panel_angle(target_angle)
     print("Tracking angle manually set to {}".format(target_angle))
@@ -104,7 +132,7 @@ def get_status():
         "target_angle": target_angle,
         "p_gain": P_GAIN,
         "i_gain": I_GAIN,
-        "integral_error": integral_error,
+        "integral_error": integral_error / 1000,
         "last_error": last_error
     }
 
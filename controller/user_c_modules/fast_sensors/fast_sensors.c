@@ -0,0 +1,63 @@
+// IntelliGlass - Smart Solar Window System
+// Fast Sensors Module for ESP32
+// Reads both LDR sensors directly through the ESP-IDF ADC driver and applies
+// the calibration in fixed point, bypassing the Python ADC objects
+//
+// Uses the legacy ESP-IDF ADC driver (driver/adc.h) and relies on machine.ADC
+// having configured the attenuation through the same driver. ESP-IDF aborts
+// at startup when the legacy driver and esp_adc/adc_oneshot are linked
+// together, so only build this module into firmware whose machine.ADC still
+// uses driver/adc.h (check ports/esp32/adc.c); otherwise leave it out of
+// micropython.cmake and sensors.py falls back to machine.ADC.
+
+#include "py/runtime.h"
+#include "py/obj.h"
+#include "py/mperrno.h"
+#include "driver/adc.h"
+
+// LDR1 on GPIO32 and LDR2 on GPIO33; sensors.py only uses this module when
+// config.LDR1_PIN / config.LDR2_PIN match
+#define LDR1_CHANNEL ADC1_CHANNEL_4
+#define LDR2_CHANNEL ADC1_CHANNEL_5
+
+// Calibration multipliers in Q16.16 fixed point (65536 == 1.0)
+static int32_t ldr_calibration[2] = {65536, 65536};
+
+// Read both LDR sensors and return a tuple of calibrated ints
+static mp_obj_t fast_sensors_read(void) {
+    int ldr1_value = adc1_get_raw(LDR1_CHANNEL);
+    int ldr2_value = adc1_get_raw(LDR2_CHANNEL);
+
+    if (ldr1_value < 0 || ldr2_value < 0) {
+        mp_raise_OSError(MP_EIO);
+    }
+
+    mp_obj_t values[2] = {
+        MP_OBJ_NEW_SMALL_INT(((int64_t)ldr1_value * ldr_calibration[0]) >> 16),
+        MP_OBJ_NEW_SMALL_INT(((int64_t)ldr2_value * ldr_calibration[1]) >> 16),
+    };
+    return mp_obj_new_tuple(2, values);
+}
+static MP_DEFINE_CONST_FUN_OBJ_0(fast_sensors_read_obj, fast_sensors_read);
+
+// Set the Q16.16 calibration multipliers for both LDR sensors
+static mp_obj_t fast_sensors_set_calibration(mp_obj_t ldr1_in, mp_obj_t ldr2_in) {
+    ldr_calibration[0] = mp_obj_get_int(ldr1_in);
+    ldr_calibration[1] = mp_obj_get_int(ldr2_in);
+    return mp_const_none;
+}
+static MP_DEFINE_CONST_FUN_OBJ_2(fast_sensors_set_calibration_obj, fast_sensors_set_calibration);
+
+static const mp_rom_map_elem_t fast_sensors_module_globals_table[] = {
+    { MP_ROM_QSTR(MP_QSTR___name__), MP_ROM_QSTR(MP_QSTR_fast_sensors) },
+    { MP_ROM_QSTR(MP_QSTR_read), MP_ROM_PTR(&fast_sensors_read_obj) },
+    { MP_ROM_QSTR(MP_QSTR_set_calibration), MP_ROM_PTR(&fast_sensors_set_calibration_obj) },
+};
+static MP_DEFINE_CONST_DICT(fast_sensors_module_globals, fast_sensors_module_globals_table);
+
+const mp_obj_module_t fast_sensors_user_cmodule = {
+    .base = { &mp_type_module },
+    .globals = (mp_obj_dict_t *)&fast_sensors_module_globals,
+};
+
+MP_REGISTER_MODULE(MP_QSTR_fast_sensors, fast_sensors_user_cmodule);
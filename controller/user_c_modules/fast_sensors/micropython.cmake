@@ -0,0 +1,12 @@
+# Fast LDR sampling module
+add_library(usermod_fast_sensors INTERFACE)
+
+target_sources(usermod_fast_sensors INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}/fast_sensors.c
+)
+
+target_include_directories(usermod_fast_sensors INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}
+)
+
+target_link_libraries(usermod INTERFACE usermod_fast_sensors)
@@ -0,0 +1,7 @@
+# IntelliGlass - Smart Solar Window System
+# Native user C modules for the ESP32 MicroPython firmware
+# Build with: make USER_C_MODULES=/path/to/controller/user_c_modules/micropython.cmake
+
+include(${CMAKE_CURRENT_LIST_DIR}/fast_sensors/micropython.cmake)
+include(${CMAKE_CURRENT_LIST_DIR}/wifievents/micropython.cmake)
+include(${CMAKE_CURRENT_LIST_DIR}/wifiscan/micropython.cmake)
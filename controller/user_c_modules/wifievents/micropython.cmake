@@ -0,0 +1,12 @@
+# WiFi event notification module
+add_library(usermod_wifievents INTERFACE)
+
+target_sources(usermod_wifievents INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}/wifievents.c
+)
+
+target_include_directories(usermod_wifievents INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}
+)
+
+target_link_libraries(usermod INTERFACE usermod_wifievents)
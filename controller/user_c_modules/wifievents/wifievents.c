@@ -0,0 +1,101 @@
+// IntelliGlass - Smart Solar Window System
+// WiFi Events Module for ESP32
+// Forwards ESP-IDF station events to a Python handler so WiFi code can
+// react to association changes instead of polling the driver
+
+#include "py/runtime.h"
+#include "py/obj.h"
+#include "esp_attr.h"
+#include "esp_event.h"
+#include "esp_wifi.h"
+
+// Event codes passed to the Python handler
+#define WIFIEVENTS_GOT_IP (1)
+#define WIFIEVENTS_DISCONNECTED (2)
+
+// Python handler, kept as a root pointer so it is not garbage collected
+MP_REGISTER_ROOT_POINTER(mp_obj_t wifievents_handler);
+
+static bool wifievents_registered = false;
+
+// Runs on the first import after each (soft) reset. The ESP-IDF handlers
+// stay registered across a soft reset but the root pointer would still
+// reference the old heap, so drop it until irq() installs a new handler.
+// Needs MICROPY_MODULE_BUILTIN_INIT, which the ESP32 port enables.
+static mp_obj_t wifievents___init__(void) {
+    MP_STATE_VM(wifievents_handler) = MP_OBJ_NULL;
+    return mp_const_none;
+}
+static MP_DEFINE_CONST_FUN_OBJ_0(wifievents___init___obj, wifievents___init__);
+
+// Scheduled on the main thread to pass an event code to the Python handler.
+// Until the module is imported in the current session __init__ has not run
+// yet and the root pointer may be left over from before a soft reset, so
+// events are dropped.
+static mp_obj_t wifievents_dispatch(mp_obj_t event_in) {
+    if (mp_map_lookup(&MP_STATE_VM(mp_loaded_modules_dict).map, MP_OBJ_NEW_QSTR(MP_QSTR_wifievents), MP_MAP_LOOKUP) == NULL) {
+        return mp_const_none;
+    }
+
+    mp_obj_t handler = MP_STATE_VM(wifievents_handler);
+    if (handler == MP_OBJ_NULL || handler == mp_const_none) {
+        return mp_const_none;
+    }
+    return mp_call_function_1(handler, event_in);
+}
+static MP_DEFINE_CONST_FUN_OBJ_1(wifievents_dispatch_obj, wifievents_dispatch);
+
+// Runs in the ESP-IDF event task; the event is queued on the MicroPython
+// scheduler and handled on the main thread between bytecodes. Placed in IRAM
+// so dispatch does not wait on flash cache misses.
+static void IRAM_ATTR wifi_event_cb(void *arg, esp_event_base_t event_base, int32_t event_id, void *event_data) {
+    int event;
+
+    if (event_base == IP_EVENT && event_id == IP_EVENT_STA_GOT_IP) {
+        event = WIFIEVENTS_GOT_IP;
+    } else if (event_base == WIFI_EVENT && event_id == WIFI_EVENT_STA_DISCONNECTED) {
+        event = WIFIEVENTS_DISCONNECTED;
+    } else {
+        return;
+    }
+
+    // The dispatcher is a ROM object, valid whatever the state of the heap
+    mp_sched_schedule(MP_OBJ_FROM_PTR(&wifievents_dispatch_obj), MP_OBJ_NEW_SMALL_INT(event));
+}
+
+// Set the Python handler called with the event code (None to disable)
+static mp_obj_t wifievents_irq(mp_obj_t handler_in) {
+    if (handler_in != mp_const_none && !mp_obj_is_callable(handler_in)) {
+        mp_raise_ValueError(MP_ERROR_TEXT("handler must be callable"));
+    }
+
+    MP_STATE_VM(wifievents_handler) = handler_in;
+
+    // The ESP-IDF handlers outlive a soft reset, register them only once
+    if (!wifievents_registered) {
+        if (esp_event_handler_register(WIFI_EVENT, WIFI_EVENT_STA_DISCONNECTED, wifi_event_cb, NULL) != ESP_OK
+            || esp_event_handler_register(IP_EVENT, IP_EVENT_STA_GOT_IP, wifi_event_cb, NULL) != ESP_OK) {
+            mp_raise_msg(&mp_type_OSError, MP_ERROR_TEXT("event handler registration failed"));
+        }
+        wifievents_registered = true;
+    }
+
+    return mp_const_none;
+}
+static MP_DEFINE_CONST_FUN_OBJ_1(wifievents_irq_obj, wifievents_irq);
+
+static const mp_rom_map_elem_t wifievents_module_globals_table[] = {
+    { MP_ROM_QSTR(MP_QSTR___name__), MP_ROM_QSTR(MP_QSTR_wifievents) },
+    { MP_ROM_QSTR(MP_QSTR___init__), MP_ROM_PTR(&wifievents___init___obj) },
+    { MP_ROM_QSTR(MP_QSTR_irq), MP_ROM_PTR(&wifievents_irq_obj) },
+    { MP_ROM_QSTR(MP_QSTR_GOT_IP), MP_ROM_INT(WIFIEVENTS_GOT_IP) },
+    { MP_ROM_QSTR(MP_QSTR_DISCONNECTED), MP_ROM_INT(WIFIEVENTS_DISCONNECTED) },
+};
+static MP_DEFINE_CONST_DICT(wifievents_module_globals, wifievents_module_globals_table);
+
+const mp_obj_module_t wifievents_user_cmodule = {
+    .base = { &mp_type_module },
+    .globals = (mp_obj_dict_t *)&wifievents_module_globals,
+};
+
+MP_REGISTER_MODULE(MP_QSTR_wifievents, wifievents_user_cmodule);
@@ -0,0 +1,12 @@
+# WiFi scan module
+add_library(usermod_wifiscan INTERFACE)
+
+target_sources(usermod_wifiscan INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}/wifiscan.c
+)
+
+target_include_directories(usermod_wifiscan INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}
+)
+
+target_link_libraries(usermod INTERFACE usermod_wifiscan)
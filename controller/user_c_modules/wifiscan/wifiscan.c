@@ -0,0 +1,97 @@
+// IntelliGlass - Smart Solar Window System
+// WiFi Scan Module for ESP32
+// Runs a station scan and returns the results as parallel columns, building
+// them straight from the ESP-IDF AP records instead of per-network tuples
+
+#include <string.h>
+
+#include "py/runtime.h"
+#include "py/obj.h"
+#include "py/objarray.h"
+#include "py/mperrno.h"
+#include "esp_wifi.h"
+
+// Order AP records by signal strength, strongest first
+// Insertion sort keeps driver order for equal RSSI (qsort is not stable);
+// scans return a few dozen records at most
+static void wifiscan_sort_by_rssi(wifi_ap_record_t *records, size_t count) {
+    for (size_t i = 1; i < count; i++) {
+        wifi_ap_record_t record = records[i];
+        size_t j = i;
+        while (j > 0 && records[j - 1].rssi < record.rssi) {
+            records[j] = records[j - 1];
+            j--;
+        }
+        records[j] = record;
+    }
+}
+
+// Scan for networks stronger than min_rssi and return a tuple of
+// (ssids list of bytes, channels bytearray, rssis signed memoryview,
+// authmodes bytearray), strongest signal first
+static mp_obj_t wifiscan_scan_fast(mp_obj_t min_rssi_in) {
+    mp_int_t min_rssi = mp_obj_get_int(min_rssi_in);
+    wifi_scan_config_t scan_config = { .show_hidden = true };
+    uint16_t count = 0;
+    esp_err_t err;
+
+    // The scan blocks for a couple of seconds, let other threads run meanwhile
+    MP_THREAD_GIL_EXIT();
+    err = esp_wifi_scan_start(&scan_config, true);
+    MP_THREAD_GIL_ENTER();
+    if (err != ESP_OK || esp_wifi_scan_get_ap_num(&count) != ESP_OK) {
+        mp_raise_OSError(MP_EIO);
+    }
+
+    wifi_ap_record_t *records = m_new(wifi_ap_record_t, count ? count : 1);
+    if (esp_wifi_scan_get_ap_records(&count, records) != ESP_OK) {
+        m_del(wifi_ap_record_t, records, count ? count : 1);
+        mp_raise_OSError(MP_EIO);
+    }
+    wifiscan_sort_by_rssi(records, count);
+
+    // Sorted, so every usable network comes before the first weak one
+    size_t n = 0;
+    while (n < count && records[n].rssi > min_rssi) {
+        n++;
+    }
+
+    mp_obj_t ssids = mp_obj_new_list(n, NULL);
+    mp_obj_array_t *channels = MP_OBJ_TO_PTR(mp_obj_new_bytearray(n, NULL));
+    int8_t *rssis = m_new(int8_t, n ? n : 1);
+    mp_obj_array_t *authmodes = MP_OBJ_TO_PTR(mp_obj_new_bytearray(n, NULL));
+    uint8_t *channel_items = channels->items;
+    uint8_t *authmode_items = authmodes->items;
+
+    for (size_t i = 0; i < n; i++) {
+        const wifi_ap_record_t *ap = &records[i];
+        mp_obj_list_store(ssids, MP_OBJ_NEW_SMALL_INT(i),
+            mp_obj_new_bytes(ap->ssid, strnlen((const char *)ap->ssid, sizeof(ap->ssid))));
+        channel_items[i] = ap->primary;
+        rssis[i] = ap->rssi;
+        authmode_items[i] = ap->authmode;
+    }
+    m_del(wifi_ap_record_t, records, count ? count : 1);
+
+    mp_obj_t values[4] = {
+        ssids,
+        MP_OBJ_FROM_PTR(channels),
+        mp_obj_new_memoryview('b', n, rssis),
+        MP_OBJ_FROM_PTR(authmodes),
+    };
+    return mp_obj_new_tuple(4, values);
+}
+static MP_DEFINE_CONST_FUN_OBJ_1(wifiscan_scan_fast_obj, wifiscan_scan_fast);
+
+static const mp_rom_map_elem_t wifiscan_module_globals_table[] = {
+    { MP_ROM_QSTR(MP_QSTR___name__), MP_ROM_QSTR(MP_QSTR_wifiscan) },
+    { MP_ROM_QSTR(MP_QSTR_scan_fast), MP_ROM_PTR(&wifiscan_scan_fast_obj) },
+};
+static MP_DEFINE_CONST_DICT(wifiscan_module_globals, wifiscan_module_globals_table);
+
+const mp_obj_module_t wifiscan_user_cmodule = {
+    .base = { &mp_type_module },
+    .globals = (mp_obj_dict_t *)&wifiscan_module_globals,
+};
+
+MP_REGISTER_MODULE(MP_QSTR_wifiscan, wifiscan_user_cmodule);
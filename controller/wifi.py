@@ -3,111 +3,498 @@
 # This module handles WiFi connectivity
 
 import time
+import random
+import micropython
 import network
+from array import array
+import uasyncio as asyncio
 import config
 
-# WiFi objects
-wlan = None
-connected = False
+# WiFi event notifications (optional, only present when built into the firmware)
+try:
+    import wifievents
+except ImportError:
+    wifievents = None
 
-# Initialize and connect to WiFi
-def connect():
-    global wlan, connected
+# Native scan result marshalling (optional, only present when built into the firmware)
+try:
+    import wifiscan
+except ImportError:
+    wifiscan = None
+
+# Maximum age of a cached RSSI reading
+RSSI_REFRESH_MS = 1000
+
+# Credentials encoded once for wlan.connect()
+_SSID_B = config.WIFI_SSID.encode('utf-8') if isinstance(config.WIFI_SSID, str) else config.WIFI_SSID
+_PW_B = config.WIFI_PASSWORD.encode('utf-8') if isinstance(config.WIFI_PASSWORD, str) else config.WIFI_PASSWORD
+
+# WiFi power management modes (ESP-IDF WIFI_PS_NONE / WIFI_PS_MIN_MODEM)
+_PM_NONE = getattr(network.WLAN, 'PM_NONE', 0)
+_PM_PERFORMANCE = getattr(network.WLAN, 'PM_PERFORMANCE', 1)
+
+# Reconnect backoff: doubles after each failed attempt up to the maximum,
+# with up to ~0.5 s of jitter; driver errors retry after a short delay
+BACKOFF_MIN_MS = 1000
+BACKOFF_MAX_MS = 60000
+TRANSIENT_RETRY_MS = 500
+
+# Link drops shorter than this are left to settle before reconnecting, so
+# a flapping AP does not trigger back-to-back connect attempts
+DISCONNECT_DEBOUNCE_MS = 500
+
+# Connection status poll interval when event notifications are unavailable
+# Short sleeps keep IRQ handlers and the scheduler responsive and return
+# soon after the link comes up
+CONNECT_POLL_MS = 50
+_POLLS_PER_S = 1000 // CONNECT_POLL_MS
+
+# Field names of the network information tuple
+NETWORK_INFO_KEYS = ("ip", "subnet", "gateway", "dns", "ssid", "rssi")
+
+# Scan result cache
+SCAN_FRESH_MS = 10000  # Serve cached scans younger than this directly
+SCAN_MAX_AGE_MS = 300000  # Serve older scans while refreshing, up to this age
+
+# SSID column of a scan
+# Holds the raw SSID bytes and decodes each one on first access, so networks
+# nobody looks at never pay for the UTF-8 decode
+class _SsidColumn:
+    def __init__(self, raw):
+        self._raw = raw
+        self._decoded = [None] * len(raw)
     
-    # Initialize WiFi in station mode
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
+    def __len__(self):
+        return len(self._raw)
     
-    # Check if already connected
-    if wlan.isconnected():
-        print("Already connected to WiFi")
-        connected = True
-        return True
+    def _ssid(self, i):
+        ssid = self._decoded[i]
+        if ssid is None:
+            ssid = self._decoded[i] = self._raw[i].decode('utf-8')
+        return ssid
     
-    # Connect to the configured access point
-    print("Connecting to WiFi network: {}".format(config.WIFI_SSID))
-    wlan.connect(config.WIFI_SSID, config.WIFI_PASSWORD)
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._ssid(j) for j in range(len(self._raw))[i]]
+        return self._ssid(i)
     
-    # Wait for connection with timeout
-    max_wait = config.WIFI_TIMEOUT
-    while max_wait > 0:
-        if wlan.isconnected():
-            break
-        max_wait -= 1
-        print("Waiting for connection...")
-        time.sleep(1)
-    
-    # Check if connected
-    if wlan.isconnected():
-        network_info = wlan.ifconfig()
-        print("WiFi connected!")
-        print("IP address: {}".format(network_info[0]))
-        connected = True
-        return True
-    else:
-        print("WiFi connection failed")
-        connected = False
+    def __iter__(self):
+        for i in range(len(self._raw)):
+            yield self._ssid(i)
+
+# Scan with the driver and build ranked columns from its tuples
+# Returns (ssids, channels, rssis, authmodes) for networks above min_rssi,
+# with the SSIDs still as raw bytes
+def _scan_columns(wlan, min_rssi):
+    networks = [n for n in wlan.scan() if n[3] > min_rssi]
+    count = len(networks)
+    
+    # Rank on packed (127 - rssi) << 16 | index keys, which sort as plain
+    # small ints without calling back into Python per element; sorting
+    # ascending puts the strongest first and keeps driver order for ties
+    keys = [((127 - networks[i][3]) << 16) | i for i in range(count)]
+    keys.sort()
+    networks = [networks[k & 0xFFFF] for k in keys]
+    
+    ssids = [None] * count
+    channels = array('B', bytes(count))
+    rssis = array('b', bytes(count))
+    authmodes = array('B', bytes(count))
+    
+    for i in range(count):
+        ssid, bssid, channel, rssi, authmode, hidden = networks[i]
+        ssids[i] = ssid
+        channels[i] = channel
+        rssis[i] = rssi
+        authmodes[i] = authmode
+    
+    return ssids, channels, rssis, authmodes
+
+# Check if an asyncio event loop is currently running
+def _loop_running():
+    try:
+        return asyncio.current_task() is not None
+    except RuntimeError:
         return False
 
-# Disconnect from WiFi
-def disconnect():
-    global connected
-    
-    if wlan and wlan.isconnected():
-        wlan.disconnect()
-        wlan.active(False)
-        connected = False
-        print("WiFi disconnected")
-
-# Check connection status
-def is_connected():
-    if wlan:
-        return wlan.isconnected()
-    return False
-
-# Reconnect if connection is lost
-def ensure_connection():
-    if not is_connected():
+# WiFi station state and operations
+# Groups the connection, cache and backoff state in one object instead of
+# module globals. This is for encapsulation only: MicroPython ignores
+# __slots__, which just documents the state fields here.
+class WiFiManager:
+    __slots__ = (
+        'wlan',
+        'connected',  # Kept up to date by the event handler when available
+        '_ifconfig_cache',  # (ip, subnet, gateway, dns) of the current association
+        '_rssi_cache',  # (ticks_ms() of the reading, rssi)
+        '_netinfo',  # Cached get_network_info_tuple() result, None when stale
+        '_backoff_ms',
+        '_retry_at',  # ticks_ms() before which no reconnect is attempted
+        '_scan_cache',  # (ticks_ms() of the scan, result)
+        '_scan_refreshing',
+        '_got_ip',  # Set by the event handler when the station obtains an IP address
+        '_down_since',  # ticks_ms() of the last DISCONNECTED event, None while up
+    )
+    
+    def __init__(self):
+        self.wlan = None
+        self.connected = False
+        self._ifconfig_cache = None
+        self._rssi_cache = None
+        self._netinfo = None
+        self._backoff_ms = BACKOFF_MIN_MS
+        self._retry_at = None
+        self._scan_cache = None
+        self._scan_refreshing = False
+        self._got_ip = None
+        self._down_since = None
+        self._init()
+    
+    # Create the station interface and hook up event notifications, once
+    # The ESP-IDF handlers outlive the Python objects, so re-registering on
+    # every connect would only churn the driver
+    def _init(self):
+        self.wlan = network.WLAN(network.STA_IF)
+        if wifievents is not None:
+            wifievents.irq(self._on_wifi_event)
+    
+    # Handle WiFi events forwarded by the wifievents module
+    # Compiled to native code to keep dispatch latency low
+    @micropython.native
+    def _on_wifi_event(self, event):
+        if event == wifievents.GOT_IP:
+            self.connected = True
+            self._ifconfig_cache = self.wlan.ifconfig()
+            self._netinfo = None
+            self._rssi_cache = (time.ticks_ms(), self.wlan.status('rssi'))
+            self._down_since = None
+            if self._got_ip is not None:
+                self._got_ip.set()
+        elif event == wifievents.DISCONNECTED:
+            self.connected = False
+            self._ifconfig_cache = None
+            self._netinfo = None
+            self._rssi_cache = None
+            if self._down_since is None:
+                self._down_since = time.ticks_ms()
+    
+    # Start connecting to the configured access point
+    # Returns True if the station is already connected
+    def _start_connect(self):
+        # Bring up the station interface if needed
+        wlan = self.wlan
+        if not wlan.active():
+            wlan.active(True)
+        self.set_power_save(config.WIFI_POWER_SAVE)
+        
+        # Check if already connected
+        if wlan.isconnected():
+            print("Already connected to WiFi")
+            self.connected = True
+            self._ifconfig_cache = wlan.ifconfig()
+            self._netinfo = None
+            return True
+        
+        # Connect to the configured access point
+        print("Connecting to WiFi network: {}".format(config.WIFI_SSID))
+        self._got_ip = asyncio.ThreadSafeFlag()  # Fresh flag, no stale events
+        wlan.connect(_SSID_B, _PW_B)
+        return False
+    
+    # Record the outcome of a connection attempt
+    def _finish_connect(self):
+        # Check if connected
+        if self.wlan.isconnected():
+            self._ifconfig_cache = self.wlan.ifconfig()
+            self._netinfo = None
+            print("WiFi connected!")
+            print("IP address: {}".format(self._ifconfig_cache[0]))
+            self.connected = True
+            return True
+        else:
+            print("WiFi connection failed")
+            self.connected = False
+            return False
+    
+    # Connect to WiFi without blocking other asyncio tasks
+    async def connect_async(self):
+        if self._start_connect():
+            return True
+        
+        if wifievents is not None:
+            # Wait for the GOT_IP event instead of polling
+            try:
+                await asyncio.wait_for_ms(self._got_ip.wait(), config.WIFI_TIMEOUT * 1000)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            # Wait for connection with timeout
+            for i in range(config.WIFI_TIMEOUT * _POLLS_PER_S):
+                if self.wlan.isconnected():
+                    break
+                if i % _POLLS_PER_S == 0:
+                    print("Waiting for connection...")
+                await asyncio.sleep_ms(CONNECT_POLL_MS)
+        
+        return self._finish_connect()
+    
+    # Connect to WiFi, blocking the caller
+    def _connect_blocking(self):
+        if self._start_connect():
+            return True
+        
+        # Wait for connection with timeout
+        for i in range(config.WIFI_TIMEOUT * _POLLS_PER_S):
+            if self.wlan.isconnected():
+                break
+            if i % _POLLS_PER_S == 0:
+                print("Waiting for connection...")
+            time.sleep_ms(CONNECT_POLL_MS)
+        
+        return self._finish_connect()
+    
+    # Initialize and connect to WiFi
+    # Runs connect_async() to completion unless called from inside a running
+    # event loop, where it falls back to polling
+    def connect(self):
+        if _loop_running():
+            return self._connect_blocking()
+        return asyncio.run(self.connect_async())
+    
+    # Enable or disable WiFi modem sleep
+    # With modem sleep (the ESP32 default) the radio only wakes for AP beacons,
+    # adding 100 ms or more of latency to incoming traffic such as MQTT
+    # commands. Disabling it keeps the radio awake at the cost of higher idle
+    # current, so solar-powered installations may want to keep it enabled.
+    def set_power_save(self, enabled):
+        try:
+            self.wlan.config(pm=_PM_PERFORMANCE if enabled else _PM_NONE)
+            return True
+        except (ValueError, OSError):
+            # Firmware without power management control
+            return False
+    
+    # Disconnect from WiFi
+    def disconnect(self):
+        if self.is_connected():
+            self.wlan.disconnect()
+            self.wlan.active(False)
+            self.connected = False
+            self._ifconfig_cache = None
+            self._netinfo = None
+            print("WiFi disconnected")
+    
+    # Check connection status
+    # With event notifications the cached flag is authoritative, otherwise the
+    # driver has to be asked
+    def is_connected(self):
+        if wifievents is not None:
+            return self.connected
+        return self.wlan.isconnected()
+    
+    # Update the reconnect backoff after an attempt
+    def _update_backoff(self, success, transient=False):
+        if success:
+            self._backoff_ms = BACKOFF_MIN_MS
+            self._retry_at = None
+            return
+        
+        if transient:
+            delay = TRANSIENT_RETRY_MS
+        else:
+            delay = self._backoff_ms + random.getrandbits(9)
+            self._backoff_ms = min(self._backoff_ms * 2, BACKOFF_MAX_MS)
+        self._retry_at = time.ticks_add(time.ticks_ms(), delay)
+    
+    # Time left before a reported disconnect counts as a lost link
+    def _debounce_left(self):
+        if self._down_since is None:
+            return 0
+        return DISCONNECT_DEBOUNCE_MS - time.ticks_diff(time.ticks_ms(), self._down_since)
+    
+    # Reconnect if connection is lost
+    # Returns False without trying while a fresh disconnect is still settling
+    # or while backing off from a failed attempt
+    def ensure_connection(self):
+        if self.is_connected():
+            return True
+        
+        if self._debounce_left() > 0:
+            return False
+        
+        if self._retry_at is not None and time.ticks_diff(self._retry_at, time.ticks_ms()) > 0:
+            return False
+        
         print("WiFi connection lost. Attempting to reconnect...")
-        return connect()
-    return True
-
-# Get WiFi signal strength
-def get_signal_strength():
-    if wlan and wlan.isconnected():
-        # RSSI (Received Signal Strength Indicator)
-        return wlan.status('rssi')
-    return None
-
-# Get network information
-def get_network_info():
-    if wlan and wlan.isconnected():
-        ip, subnet, gateway, dns = wlan.ifconfig()
-        return {
-            "ip": ip,
-            "subnet": subnet,
-            "gateway": gateway,
-            "dns": dns,
-            "ssid": config.WIFI_SSID,
-            "rssi": get_signal_strength()
+        try:
+            success = self.connect()
+        except OSError as e:
+            print("WiFi driver error:", e)
+            self._update_backoff(False, transient=True)
+            return False
+        
+        self._update_backoff(success)
+        return success
+    
+    # Reconnect if connection is lost, without blocking other asyncio tasks
+    # Waits out a fresh disconnect and any backoff from a previous failed
+    # attempt first
+    async def ensure_connection_async(self):
+        if self.is_connected():
+            return True
+        
+        delay = self._debounce_left()
+        if delay > 0:
+            await asyncio.sleep_ms(delay)
+            if self.is_connected():
+                return True
+        
+        if self._retry_at is not None:
+            delay = time.ticks_diff(self._retry_at, time.ticks_ms())
+            if delay > 0:
+                await asyncio.sleep_ms(delay)
+        
+        print("WiFi connection lost. Attempting to reconnect...")
+        try:
+            success = await self.connect_async()
+        except OSError as e:
+            print("WiFi driver error:", e)
+            self._update_backoff(False, transient=True)
+            return False
+        
+        self._update_backoff(success)
+        return success
+    
+    # Get WiFi signal strength
+    # Readings are reused for up to RSSI_REFRESH_MS to spare frequent callers
+    # a driver query each time
+    def get_signal_strength(self):
+        if self.is_connected():
+            now = time.ticks_ms()
+            cache = self._rssi_cache
+            if cache is not None and time.ticks_diff(now, cache[0]) < RSSI_REFRESH_MS:
+                return cache[1]
+            
+            # RSSI (Received Signal Strength Indicator)
+            rssi = self.wlan.status('rssi')
+            self._rssi_cache = (now, rssi)
+            return rssi
+        return None
+    
+    # Get network information as an (ip, subnet, gateway, dns, ssid, rssi) tuple
+    # The tuple is reused until the association or the RSSI reading changes,
+    # so periodic callers get it without allocating
+    def get_network_info_tuple(self):
+        if self.is_connected():
+            rssi = self.get_signal_strength()
+            ifconfig = self._ifconfig()
+            info = self._netinfo
+            if info is None or info[5] != rssi:
+                info = self._netinfo = ifconfig + (config.WIFI_SSID, rssi)
+            return info
+        return None
+    
+    # Get the current (ip, subnet, gateway, dns)
+    # Events keep the cache current; without them the driver may reassociate
+    # and renew the DHCP lease unnoticed, so the addresses are re-read
+    def _ifconfig(self):
+        ifconfig = self._ifconfig_cache
+        if ifconfig is None or wifievents is None:
+            current = self.wlan.ifconfig()
+            if current != ifconfig:
+                self._ifconfig_cache = ifconfig = current
+                self._netinfo = None
+        return ifconfig
+    
+    # Get network information
+    def get_network_info(self):
+        info = self.get_network_info_tuple()
+        if info is None:
+            return None
+        return dict(zip(NETWORK_INFO_KEYS, info))
+    
+    # Scan for available networks
+    # Returns parallel sequences, entry i of each describes the same network,
+    # strongest signal first. Scanning blocks for a couple of seconds, so
+    # results younger than SCAN_FRESH_MS are reused as they are. Inside a
+    # running event loop, older results up to SCAN_MAX_AGE_MS are returned
+    # while a rescan is queued; otherwise anything older rescans right away.
+    def scan_networks(self):
+        cache = self._scan_cache
+        if cache is not None:
+            age = time.ticks_diff(time.ticks_ms(), cache[0])
+            if age < SCAN_FRESH_MS:
+                return cache[1]
+            if age < SCAN_MAX_AGE_MS and _loop_running():
+                if not self._scan_refreshing:
+                    self._scan_refreshing = True
+                    asyncio.create_task(self._refresh_scan())
+                return cache[1]
+        
+        return self._scan_now()
+    
+    # Refresh the scan cache from a separate task
+    # Only the caller of scan_networks() is spared the wait: the driver scan
+    # cannot be awaited, so once this task runs it blocks the whole event loop
+    # for the 1.5-2 s the scan takes
+    async def _refresh_scan(self):
+        try:
+            self._scan_now()
+        finally:
+            self._scan_refreshing = False
+    
+    # Scan for available networks and update the cache
+    def _scan_now(self):
+        wlan = self.wlan
+        if not wlan.active():
+            wlan.active(True)
+        
+        # At -85 dBm or below association and handshakes are unreliable,
+        # so drop those networks before any decoding and rank the rest
+        min_rssi = config.WIFI_MIN_RSSI
+        if wifiscan is not None:
+            # Filtered, ranked columns straight from the driver records
+            ssids, channels, rssis, authmodes = wifiscan.scan_fast(min_rssi)
+        else:
+            ssids, channels, rssis, authmodes = _scan_columns(wlan, min_rssi)
+        
+        result = {
+            "ssid": _SsidColumn(ssids),
+            "channel": channels,
+            "rssi": rssis,
+            "authmode": authmodes
         }
-    return None
-
-# Scan for available networks
-def scan_networks():
-    if wlan:
-        wlan.active(True)
-        networks = wlan.scan()
-        result = []
+        self._scan_cache = (time.ticks_ms(), result)
+        return result
+    
+    # Scan for available networks, one dict per network
+    def scan_networks_legacy(self):
+        scan = self.scan_networks()
+        if scan is None:
+            return None
         
-        for ssid, bssid, channel, rssi, authmode, hidden in networks:
+        result = []
+        for i in range(len(scan["ssid"])):
             result.append({
-                "ssid": ssid.decode('utf-8'),
-                "channel": channel,
-                "rssi": rssi,
-                "authmode": authmode
+                "ssid": scan["ssid"][i],
+                "channel": scan["channel"][i],
+                "rssi": scan["rssi"][i],
+                "authmode": scan["authmode"][i]
             })
-        
         return result
-    
-    return None
\ No newline at end of file
+
+# Module singleton, with its methods exposed as module functions
+manager = WiFiManager()
+
+connect = manager.connect
+connect_async = manager.connect_async
+disconnect = manager.disconnect
+is_connected = manager.is_connected
+ensure_connection = manager.ensure_connection
+ensure_connection_async = manager.ensure_connection_async
+set_power_save = manager.set_power_save
+get_signal_strength = manager.get_signal_strength
+get_network_info = manager.get_network_info
+get_network_info_tuple = manager.get_network_info_tuple
+scan_networks = manager.scan_networks
+scan_networks_legacy = manager.scan_networks_legacy
\ No newline at end of file